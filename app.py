@@ -1,20 +1,101 @@
 import streamlit as st
+import functools
 import json
 import os
 from datetime import datetime
 from note_manager import NoteManager
 from pdf_generator import PDFGenerator
 
+# The note manager and PDF generator are shared by every session on the
+# server, so the notes file is parsed and indexed once per process
+@st.cache_resource
+def get_note_manager(data_file: str = "data/notes.json") -> NoteManager:
+    return NoteManager(data_file)
+
+@st.cache_resource
+def get_pdf_generator() -> PDFGenerator:
+    return PDFGenerator()
+
+note_manager = get_note_manager()
+
 # Initialize session state
-if 'note_manager' not in st.session_state:
-    st.session_state.note_manager = NoteManager()
-if 'pdf_generator' not in st.session_state:
-    st.session_state.pdf_generator = PDFGenerator()
 if 'current_note_id' not in st.session_state:
     st.session_state.current_note_id = None
 if 'edit_mode' not in st.session_state:
     st.session_state.edit_mode = False
 
+EDITOR_CSS = """
+<style>
+div.stButton > button {
+    height: 45px;
+    font-weight: bold;
+    border-radius: 8px;
+    border: 2px solid #e0e0e0;
+    transition: all 0.3s;
+}
+div.stButton > button:hover {
+    border-color: #1976d2;
+    background-color: #f5f5f5;
+    transform: translateY(-2px);
+}
+</style>
+"""
+
+# Formatting toolbar: (label, help, widget key, example to copy, explanation)
+FORMAT_BUTTONS = [
+    ("**B**", "Bold Text", "bold_btn", "**bold text**", "Use **text** to make text bold"),
+    ("*I*", "Italic Text", "italic_btn", "*italic text*", "Use *text* to make text italic"),
+    ("~~S~~", "Strikethrough", "strike_btn", "~~strikethrough~~", "Use ~~text~~ to cross out text"),
+    ("`Code`", "Inline Code", "code_btn", "`inline code`", "Use `code` for inline code formatting"),
+    ("# H1", "Large Heading", "h1_btn", "# Large Heading", "Use # for the largest heading"),
+    ("## H2", "Medium Heading", "h2_btn", "## Medium Heading", "Use ## for medium-sized headings"),
+    ("### H3", "Small Heading", "h3_btn", "### Small Heading", "Use ### for smaller headings"),
+    ("🔗 Link", "Web Link", "link_btn", "[link text](https://example.com)", "Use [text](url) to create clickable links"),
+    ("• List", "Bullet List", "bullet_btn", "• First item\n• Second item\n• Third item", "Use • or - for bullet points"),
+    ("1. List", "Numbered List", "num_btn", "1. First item\n2. Second item\n3. Third item", "Use 1. 2. 3. for numbered lists"),
+    ("💬 Quote", "Quote Block", "quote_btn", "> This is a quote\n> Multi-line quote", "Use > at start of line for quotes"),
+    ("</> Code", "Code Block", "codeblock_btn", "```\ncode block\nmore code\n```", "Use ``` to wrap code blocks"),
+    ("━━━", "Horizontal Line", "hr_btn", "---", "Use --- for horizontal divider lines"),
+    ("📊 Table", "Table", "table_btn", "| Header 1 | Header 2 |\n|----------|----------|\n| Cell 1   | Cell 2   |", "Use | to create table columns"),
+    ("☑️ Check", "Checklist", "check_btn", "- [ ] Unchecked item\n- [x] Checked item", "Use - [ ] for checkboxes"),
+    # Auto-suggest helpful templates
+    ("⚡ Auto", "Smart Templates", "auto_btn",
+     "# Title\n\n**Summary:** Brief overview\n\n## Main Points\n• Point 1\n• Point 2\n\n**Conclusion:** Final thoughts",
+     "Smart template: Complete note structure with headings, bold text, and bullet points"),
+]
+
+# Notes listed per sidebar page
+SIDEBAR_PAGE_SIZE = 25
+
+# Characters of a note rendered in the side-by-side preview before the rest is collapsed
+PREVIEW_CHAR_LIMIT = 8192
+
+# Timestamps never change once written, so their display strings are memoized
+@functools.lru_cache(maxsize=4096)
+def _fmt_short(iso: str) -> str:
+    return datetime.fromisoformat(iso).strftime("%m/%d/%y %H:%M")
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_long(iso: str) -> str:
+    return datetime.fromisoformat(iso).strftime("%B %d, %Y at %I:%M %p")
+
+@functools.lru_cache(maxsize=64)
+def _render_content(content: str) -> str:
+    """Markdown/HTML for st.markdown that keeps line breaks exactly as typed"""
+    # Escaping '<' is enough to stop notes from injecting tags; '>' is left
+    # alone so markdown quotes keep working
+    return content.replace('<', '&lt;').replace('\n', '<br>')
+
+# Cached PDF builders. Arguments starting with an underscore are not hashed,
+# so the cache key is just the scalars identifying a version of the note(s).
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_single_pdf(note_id: str, updated_at: str, title: str, content: str, _note: dict) -> bytes:
+    return get_pdf_generator().generate_single_note_pdf(_note)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_all_notes_pdf(notes_key: tuple, _notes: list) -> bytes:
+    return get_pdf_generator().generate_all_notes_pdf(_notes)
+
 def main():
     st.set_page_config(
         page_title="Note Taking App",
@@ -42,15 +123,11 @@ def main():
         search_query = st.text_input("🔍 Search notes", placeholder="Enter keywords...")
         
         # Load and display notes
-        notes = st.session_state.note_manager.get_all_notes()
+        notes = note_manager.get_all_notes()
         
         # Filter notes based on search
         if search_query:
-            filtered_notes = [
-                note for note in notes 
-                if search_query.lower() in note['title'].lower() or 
-                   search_query.lower() in note['content'].lower()
-            ]
+            filtered_notes = note_manager.search_notes(search_query)
         else:
             filtered_notes = notes
         
@@ -60,8 +137,16 @@ def main():
             else:
                 st.info("No notes yet. Create your first note!")
         else:
+            # Only one page of notes gets widgets, so a rerun costs the same
+            # however large the notebook is
+            page_count = (len(filtered_notes) + SIDEBAR_PAGE_SIZE - 1) // SIDEBAR_PAGE_SIZE
+            page = 1
+            if page_count > 1:
+                page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+            page_notes = filtered_notes[(page - 1) * SIDEBAR_PAGE_SIZE:page * SIDEBAR_PAGE_SIZE]
+            
             # Display notes list
-            for note in filtered_notes:
+            for note in page_notes:
                 col1, col2 = st.columns([4, 1])
                 with col1:
                     if st.button(
@@ -75,14 +160,14 @@ def main():
                 
                 with col2:
                     if st.button("🗑️", key=f"delete_{note['id']}", help="Delete note"):
-                        if st.session_state.note_manager.delete_note(note['id']):
+                        if note_manager.delete_note(note['id']):
                             if st.session_state.current_note_id == note['id']:
                                 st.session_state.current_note_id = None
                             st.success("Note deleted!")
                             st.rerun()
                 
                 # Show creation date
-                created_date = datetime.fromisoformat(note['created_at']).strftime("%m/%d/%y %H:%M")
+                created_date = _fmt_short(note['created_at'])
                 st.caption(f"Created: {created_date}")
                 st.markdown("---")
         
@@ -90,30 +175,34 @@ def main():
         if notes:
             st.header("📤 Export Options")
             
+            # PDFs are passed as callables so they are only built when the
+            # user actually clicks download, not on every rerun
             # Export current note
             if st.session_state.current_note_id:
-                if st.button("📄 Export Current Note to PDF", use_container_width=True):
-                    current_note = st.session_state.note_manager.get_note(st.session_state.current_note_id)
-                    if current_note:
-                        pdf_bytes = st.session_state.pdf_generator.generate_single_note_pdf(current_note)
-                        st.download_button(
-                            label="💾 Download PDF",
-                            data=pdf_bytes,
-                            file_name=f"{current_note['title']}.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                current_note = note_manager.get_note(st.session_state.current_note_id)
+                if current_note:
+                    st.download_button(
+                        label="📄 Export Current Note to PDF",
+                        data=lambda: _cached_single_pdf(
+                            current_note['id'], current_note['updated_at'],
+                            current_note['title'], current_note['content'],
+                            current_note
+                        ),
+                        file_name=f"{current_note['title']}.pdf",
+                        mime="application/pdf",
+                        use_container_width=True
+                    )
             
             # Export all notes
-            if st.button("📚 Export All Notes to PDF", use_container_width=True):
-                pdf_bytes = st.session_state.pdf_generator.generate_all_notes_pdf(notes)
-                st.download_button(
-                    label="💾 Download All Notes PDF",
-                    data=pdf_bytes,
-                    file_name=f"all_notes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.download_button(
+                label="📚 Export All Notes to PDF",
+                data=lambda: _cached_all_notes_pdf(
+                    tuple((note['id'], note['updated_at']) for note in notes), notes
+                ),
+                file_name=f"all_notes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
     
     # Main content area
     if st.session_state.edit_mode or st.session_state.current_note_id is None:
@@ -128,109 +217,23 @@ def show_note_editor():
     # Get current note if editing existing one
     current_note = None
     if st.session_state.current_note_id:
-        current_note = st.session_state.note_manager.get_note(st.session_state.current_note_id)
-    
-    # Note title input
-    title = st.text_input(
-        "📝 Note Title",
-        value=current_note['title'] if current_note else "",
-        placeholder="Enter your note title..."
-    )
-    
-    # Markdown formatting toolbar
-    st.markdown("### ✍️ Note Content")
+        current_note = note_manager.get_note(st.session_state.current_note_id)
     
     # Enhanced formatting toolbar with better styling
     st.markdown("### ✨ Quick Formatting Tools")
     
-    # Add custom CSS for better button styling
-    st.markdown("""
-    <style>
-    div.stButton > button {
-        height: 45px;
-        font-weight: bold;
-        border-radius: 8px;
-        border: 2px solid #e0e0e0;
-        transition: all 0.3s;
-    }
-    div.stButton > button:hover {
-        border-color: #1976d2;
-        background-color: #f5f5f5;
-        transform: translateY(-2px);
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Row 1: Basic formatting with better visual labels
-    row1_col1, row1_col2, row1_col3, row1_col4, row1_col5, row1_col6, row1_col7, row1_col8 = st.columns(8)
-    with row1_col1:
-        if st.button("**B**", help="Bold Text", key="bold_btn", use_container_width=True):
-            st.session_state.format_hint = "**bold text**"
-            st.session_state.hint_explanation = "Use **text** to make text bold"
-    with row1_col2:
-        if st.button("*I*", help="Italic Text", key="italic_btn", use_container_width=True):
-            st.session_state.format_hint = "*italic text*"
-            st.session_state.hint_explanation = "Use *text* to make text italic"
-    with row1_col3:
-        if st.button("~~S~~", help="Strikethrough", key="strike_btn", use_container_width=True):
-            st.session_state.format_hint = "~~strikethrough~~"
-            st.session_state.hint_explanation = "Use ~~text~~ to cross out text"
-    with row1_col4:
-        if st.button("`Code`", help="Inline Code", key="code_btn", use_container_width=True):
-            st.session_state.format_hint = "`inline code`"
-            st.session_state.hint_explanation = "Use `code` for inline code formatting"
-    with row1_col5:
-        if st.button("# H1", help="Large Heading", key="h1_btn", use_container_width=True):
-            st.session_state.format_hint = "# Large Heading"
-            st.session_state.hint_explanation = "Use # for the largest heading"
-    with row1_col6:
-        if st.button("## H2", help="Medium Heading", key="h2_btn", use_container_width=True):
-            st.session_state.format_hint = "## Medium Heading"
-            st.session_state.hint_explanation = "Use ## for medium-sized headings"
-    with row1_col7:
-        if st.button("### H3", help="Small Heading", key="h3_btn", use_container_width=True):
-            st.session_state.format_hint = "### Small Heading"
-            st.session_state.hint_explanation = "Use ### for smaller headings"
-    with row1_col8:
-        if st.button("🔗 Link", help="Web Link", key="link_btn", use_container_width=True):
-            st.session_state.format_hint = "[link text](https://example.com)"
-            st.session_state.hint_explanation = "Use [text](url) to create clickable links"
+    # Add custom CSS for better button styling. It has to be emitted on every
+    # rerun: elements a rerun doesn't draw are removed from the page.
+    st.markdown(EDITOR_CSS, unsafe_allow_html=True)
     
-    # Row 2: Lists and advanced formatting with better visual labels
-    row2_col1, row2_col2, row2_col3, row2_col4, row2_col5, row2_col6, row2_col7, row2_col8 = st.columns(8)
-    with row2_col1:
-        if st.button("• List", help="Bullet List", key="bullet_btn", use_container_width=True):
-            st.session_state.format_hint = "• First item\n• Second item\n• Third item"
-            st.session_state.hint_explanation = "Use • or - for bullet points"
-    with row2_col2:
-        if st.button("1. List", help="Numbered List", key="num_btn", use_container_width=True):
-            st.session_state.format_hint = "1. First item\n2. Second item\n3. Third item"
-            st.session_state.hint_explanation = "Use 1. 2. 3. for numbered lists"
-    with row2_col3:
-        if st.button("💬 Quote", help="Quote Block", key="quote_btn", use_container_width=True):
-            st.session_state.format_hint = "> This is a quote\n> Multi-line quote"
-            st.session_state.hint_explanation = "Use > at start of line for quotes"
-    with row2_col4:
-        if st.button("</> Code", help="Code Block", key="codeblock_btn", use_container_width=True):
-            st.session_state.format_hint = "```\ncode block\nmore code\n```"
-            st.session_state.hint_explanation = "Use ``` to wrap code blocks"
-    with row2_col5:
-        if st.button("━━━", help="Horizontal Line", key="hr_btn", use_container_width=True):
-            st.session_state.format_hint = "---"
-            st.session_state.hint_explanation = "Use --- for horizontal divider lines"
-    with row2_col6:
-        if st.button("📊 Table", help="Table", key="table_btn", use_container_width=True):
-            st.session_state.format_hint = "| Header 1 | Header 2 |\n|----------|----------|\n| Cell 1   | Cell 2   |"
-            st.session_state.hint_explanation = "Use | to create table columns"
-    with row2_col7:
-        if st.button("☑️ Check", help="Checklist", key="check_btn", use_container_width=True):
-            st.session_state.format_hint = "- [ ] Unchecked item\n- [x] Checked item"
-            st.session_state.hint_explanation = "Use - [ ] for checkboxes"
-    with row2_col8:
-        if st.button("⚡ Auto", help="Smart Templates", key="auto_btn", use_container_width=True):
-            # Auto-suggest helpful templates
-            st.session_state.format_hint = "# Title\n\n**Summary:** Brief overview\n\n## Main Points\n• Point 1\n• Point 2\n\n**Conclusion:** Final thoughts"
-            st.session_state.hint_explanation = "Smart template: Complete note structure with headings, bold text, and bullet points"
+    # Two rows of formatting buttons: basics first, then lists and advanced formatting
+    for row_start in range(0, len(FORMAT_BUTTONS), 8):
+        row = FORMAT_BUTTONS[row_start:row_start + 8]
+        for col, (label, help_text, key, hint, explanation) in zip(st.columns(8), row):
+            with col:
+                if st.button(label, help=help_text, key=key, use_container_width=True):
+                    st.session_state.format_hint = hint
+                    st.session_state.hint_explanation = explanation
     
     # Enhanced hint system with explanation and examples
     if hasattr(st.session_state, 'format_hint'):
@@ -252,12 +255,24 @@ def show_note_editor():
                 delattr(st.session_state, 'hint_explanation')
             st.rerun()
     
-    # Markdown editor with enhanced placeholder and keyboard shortcuts
-    content = st.text_area(
-        "Write your note with markdown formatting:",
-        value=current_note['content'] if current_note else "",
-        height=350,
-        placeholder="""💡 Start writing your note here...
+    # Title and content live in a form so typing doesn't rerun the whole
+    # script; the page only updates on Save, Preview or Cancel
+    with st.form("edit_note", clear_on_submit=False):
+        # Note title input
+        title = st.text_input(
+            "📝 Note Title",
+            value=current_note['title'] if current_note else "",
+            placeholder="Enter your note title..."
+        )
+        
+        st.markdown("### ✍️ Note Content")
+        
+        # Markdown editor with enhanced placeholder and keyboard shortcuts
+        content = st.text_area(
+            "Write your note with markdown formatting:",
+            value=current_note['content'] if current_note else "",
+            height=350,
+            placeholder="""💡 Start writing your note here...
 
 ⚡ Quick Tips:
 • Use the buttons above for instant formatting
@@ -268,60 +283,68 @@ def show_note_editor():
 • Add [ ] for checkboxes
 
 🎯 Try clicking the ⚡Auto button for smart templates!
-🔍 Live preview shows below as you type!""",
-        help="💫 Pro tip: Click any formatting button above for instant examples and copy-paste templates!"
-    )
+🔍 Click 👀 Preview to see your formatting below!""",
+            help="💫 Pro tip: Click any formatting button above for instant examples and copy-paste templates!"
+        )
+        
+        # Action buttons
+        col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+        with col1:
+            save_clicked = st.form_submit_button("💾 Save Note", type="primary", use_container_width=True)
+        with col2:
+            st.form_submit_button("👀 Preview", use_container_width=True)
+        with col3:
+            cancel_clicked = st.form_submit_button("❌ Cancel", use_container_width=True)
     
-    # Action buttons
-    col1, col2, col3 = st.columns([1, 1, 2])
+    # Strip once; every check and save below works on these copies
+    stripped_title = title.strip()
+    stripped_content = content.strip()
     
-    with col1:
-        if st.button("💾 Save Note", type="primary", use_container_width=True):
-            if title.strip() and content.strip():
-                if st.session_state.current_note_id:
-                    # Update existing note
-                    success = st.session_state.note_manager.update_note(
-                        st.session_state.current_note_id,
-                        title.strip(),
-                        content.strip()
-                    )
-                    if success:
-                        st.success("Note updated successfully!")
-                        st.session_state.edit_mode = False
-                        st.rerun()
-                    else:
-                        st.error("Failed to update note.")
+    if save_clicked:
+        if stripped_title and stripped_content:
+            if st.session_state.current_note_id:
+                # Update existing note
+                success = note_manager.update_note(
+                    st.session_state.current_note_id,
+                    stripped_title,
+                    stripped_content
+                )
+                if success:
+                    st.success("Note updated successfully!")
+                    st.session_state.edit_mode = False
+                    st.rerun()
                 else:
-                    # Create new note
-                    note_id = st.session_state.note_manager.create_note(title.strip(), content.strip())
-                    if note_id:
-                        st.success("Note saved successfully!")
-                        st.session_state.current_note_id = note_id
-                        st.session_state.edit_mode = False
-                        st.rerun()
-                    else:
-                        st.error("Failed to save note.")
+                    st.error("Failed to update note.")
             else:
-                st.warning("Please enter both title and content.")
+                # Create new note
+                note_id = note_manager.create_note(stripped_title, stripped_content)
+                if note_id:
+                    st.success("Note saved successfully!")
+                    st.session_state.current_note_id = note_id
+                    st.session_state.edit_mode = False
+                    st.rerun()
+                else:
+                    st.error("Failed to save note.")
+        else:
+            st.warning("Please enter both title and content.")
     
-    with col2:
-        if st.button("❌ Cancel", use_container_width=True):
-            st.session_state.edit_mode = False
-            st.rerun()
+    if cancel_clicked:
+        st.session_state.edit_mode = False
+        st.rerun()
     
     # Enhanced Real-time Preview section
-    if title.strip() or content.strip():
+    if stripped_title or stripped_content:
         st.markdown("---")
         preview_header_col1, preview_header_col2 = st.columns([3, 1])
         
         with preview_header_col1:
-            st.header("👀 Live Preview")
+            st.header("👀 Preview")
         
         with preview_header_col2:
             # Toggle preview mode
             preview_mode = st.selectbox("🔍 View", ["Side by Side", "Preview Only", "Raw Only"], key="preview_mode")
         
-        if content.strip():
+        if stripped_content:
             if preview_mode == "Side by Side":
                 preview_col1, preview_col2 = st.columns([1, 1])
                 
@@ -332,31 +355,32 @@ def show_note_editor():
                 
                 with preview_col2:
                     st.subheader("🎨 Rendered Preview")
-                    if title.strip():
+                    if stripped_title:
                         st.markdown(f"# {title}")
-                    # Preserve line breaks exactly as typed
-                    content_with_breaks = content.replace('\n', '<br>')
-                    st.markdown(content_with_breaks, unsafe_allow_html=True)
+                    # Long notes only render their head on each submit;
+                    # the remainder is sent to the browser on request
+                    st.markdown(_render_content(content[:PREVIEW_CHAR_LIMIT]), unsafe_allow_html=True)
+                    if len(content) > PREVIEW_CHAR_LIMIT:
+                        if st.checkbox("Show full preview", key="show_full_preview"):
+                            st.markdown(_render_content(content[PREVIEW_CHAR_LIMIT:]), unsafe_allow_html=True)
             
             elif preview_mode == "Preview Only":
-                if title.strip():
+                if stripped_title:
                     st.markdown(f"# {title}")
-                # Preserve line breaks exactly as typed
-                content_with_breaks = content.replace('\n', '<br>')
-                st.markdown(content_with_breaks, unsafe_allow_html=True)
+                st.markdown(_render_content(content), unsafe_allow_html=True)
             
             else:  # Raw Only
                 st.code(content, language="markdown")
             
         else:
-            if title.strip():
+            if stripped_title:
                 st.markdown(f"# {title}")
                 st.info("✨ Start typing content to see the live preview...")
 
 def show_note_viewer():
     """Display the note viewer interface"""
     if st.session_state.current_note_id:
-        note = st.session_state.note_manager.get_note(st.session_state.current_note_id)
+        note = note_manager.get_note(st.session_state.current_note_id)
         if note:
             # Note header with actions
             col1, col2, col3 = st.columns([3, 1, 1])
@@ -370,29 +394,25 @@ def show_note_viewer():
                     st.rerun()
             
             with col3:
-                if st.button("📄 Export PDF", use_container_width=True):
-                    pdf_bytes = st.session_state.pdf_generator.generate_single_note_pdf(note)
-                    st.download_button(
-                        label="💾 Download",
-                        data=pdf_bytes,
-                        file_name=f"{note['title']}.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+                st.download_button(
+                    label="📄 Export PDF",
+                    data=lambda: _cached_single_pdf(
+                        note['id'], note['updated_at'], note['title'], note['content'], note
+                    ),
+                    file_name=f"{note['title']}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
             
             # Note metadata
-            created_date = datetime.fromisoformat(note['created_at']).strftime("%B %d, %Y at %I:%M %p")
-            updated_date = datetime.fromisoformat(note['updated_at']).strftime("%B %d, %Y at %I:%M %p")
-            
-            st.caption(f"📅 Created: {created_date}")
+            st.caption(f"📅 Created: {_fmt_long(note['created_at'])}")
             if note['created_at'] != note['updated_at']:
-                st.caption(f"🔄 Last updated: {updated_date}")
+                st.caption(f"🔄 Last updated: {_fmt_long(note['updated_at'])}")
             
             st.markdown("---")
             
             # Note content with enhanced markdown rendering (preserving line breaks)
-            content_with_breaks = note['content'].replace('\n', '<br>')
-            st.markdown(content_with_breaks, unsafe_allow_html=True)
+            st.markdown(_render_content(note['content']), unsafe_allow_html=True)
             
             
         else:
@@ -1,44 +1,227 @@
+import functools
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from operator import itemgetter
+from typing import List, Dict, Optional, Tuple
 import uuid
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib encoder works the same, just slower
+    orjson = None
+
+# The change log is folded back into the snapshot once it outgrows it,
+# but small notebooks are not compacted on every write
+LOG_COMPACT_MIN_BYTES = 64 * 1024
+
+# The snapshot is written as compact JSON; set NOTES_DEBUG_INDENT=1 to get
+# an indented file that is easier to read by hand
+SNAPSHOT_INDENT = bool(os.environ.get('NOTES_DEBUG_INDENT'))
+
+# Notes are ordered newest first; timestamps only have second precision,
+# so the id breaks ties and keeps the order stable across reloads
+_sort_key = itemgetter('created_at', 'id')
+
+def _synchronized(method):
+    """Run a NoteManager method while holding the instance lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def _loads(data: bytes):
+    """Parse JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _annotate(note: Dict) -> Dict:
+    """Attach casefolded copies of the title and content for searching"""
+    note['_title_cf'] = note['title'].casefold()
+    note['_content_cf'] = note['content'].casefold()
+    return note
+
+def _strip_transient(note: Dict) -> Dict:
+    """Drop the in-memory-only fields (prefixed with '_') before writing a note"""
+    return {key: value for key, value in note.items() if not key.startswith('_')}
+
 class NoteManager:
     def __init__(self, data_file: str = "data/notes.json"):
         self.data_file = data_file
+        self.log_file = os.path.splitext(data_file)[0] + ".jsonl"
+        self._notes: Optional[List[Dict]] = None
+        self._by_id: Dict[str, Dict] = {}
+        self._stamp: Tuple[float, float] = (0, 0)
+        self._batch_depth = 0
+        self._dirty = False
+        # One manager may be shared by several Streamlit sessions (threads)
+        self._lock = threading.RLock()
         self.ensure_data_directory()
     
     def ensure_data_directory(self):
         """Ensure the data directory exists"""
         os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        if not os.path.exists(self.data_file):
+        if not os.path.exists(self.data_file) and not os.path.exists(self.log_file):
             self.save_notes([])
     
+    def _file_stamp(self) -> Tuple[float, float]:
+        """Modification times of the snapshot and the change log"""
+        stamp = []
+        for path in (self.data_file, self.log_file):
+            try:
+                stamp.append(os.path.getmtime(path))
+            except FileNotFoundError:
+                stamp.append(0)
+        return tuple(stamp)
+    
+    def _set_notes(self, notes: Optional[List[Dict]]):
+        """Replace the cached notes and rebuild the id index over the same dicts"""
+        if notes:
+            # Kept newest first so get_all_notes never has to sort
+            notes.sort(key=_sort_key, reverse=True)
+        self._notes = notes
+        self._by_id = {}
+        for note in notes or ():
+            self._by_id[note['id']] = _annotate(note)
+    
+    @_synchronized
     def load_notes(self) -> List[Dict]:
-        """Load notes from JSON file"""
+        """Load notes from the JSON snapshot plus the change log, reusing the parsed list until either file changes"""
+        if self._dirty:
+            # Unflushed batch changes are newer than anything on disk
+            return self._notes
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stamp = self._file_stamp()
+            if self._notes is None or stamp != self._stamp:
+                notes = []
+                if os.path.exists(self.data_file):
+                    with open(self.data_file, 'rb') as f:
+                        notes = _loads(f.read())
+                self._stamp = stamp
+                self._set_notes(self._replay_log(notes))
+            return self._notes
         except (FileNotFoundError, json.JSONDecodeError):
+            self._set_notes(None)
             return []
     
+    def _replay_log(self, notes: List[Dict]) -> List[Dict]:
+        """Apply the change log on top of the snapshot"""
+        if not os.path.exists(self.log_file):
+            return notes
+        
+        by_id = {note['id']: note for note in notes}
+        torn = False
+        with open(self.log_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = _loads(line)
+                except json.JSONDecodeError:
+                    torn = True  # Interrupted append
+                    continue
+                if record['op'] == 'upsert':
+                    by_id[record['note']['id']] = record['note']
+                elif record['op'] == 'delete':
+                    by_id.pop(record['id'], None)
+        
+        notes = list(by_id.values())
+        if torn:
+            # Rewrite the snapshot so later appends don't land after a partial line
+            self.save_notes(notes)
+        return notes
+    
+    @_synchronized
     def save_notes(self, notes: List[Dict]) -> bool:
-        """Save notes to JSON file"""
+        """Write a full snapshot to the JSON file and clear the change log (deferred while inside a batch)"""
+        if self._batch_depth:
+            if notes is not self._notes:
+                self._set_notes(notes)
+            self._dirty = True
+            return True
+        tmp_file = self.data_file + '.tmp'
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(notes, f, indent=2, ensure_ascii=False)
+            # Write to a temp file and swap it in, so readers and crashes
+            # never see a truncated snapshot
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps([_strip_transient(note) for note in notes], indent=SNAPSHOT_INDENT))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.data_file)
+            # Everything in the log is now part of the snapshot
+            if os.path.exists(self.log_file):
+                os.remove(self.log_file)
+            # Keep the cache in step with what was just written
+            if notes is not self._notes:
+                self._set_notes(notes)
+            self._stamp = self._file_stamp()
+            self._dirty = False
             return True
         except Exception as e:
             print(f"Error saving notes: {e}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            # The cached list may hold changes that never reached disk
+            self._set_notes(None)
+            self._dirty = False
             return False
     
+    def _append_log(self, record: Dict) -> bool:
+        """Append one change record to the log instead of rewriting the snapshot"""
+        if self._batch_depth:
+            self._dirty = True
+            return True
+        try:
+            with open(self.log_file, 'ab') as f:
+                f.write(_dumps(record) + b'\n')
+            self._stamp = self._file_stamp()
+        except Exception as e:
+            print(f"Error saving notes: {e}")
+            self._set_notes(None)
+            return False
+        
+        self._maybe_compact()
+        return True
+    
+    def _maybe_compact(self):
+        """Fold the change log into the snapshot once it is larger than the notes it describes"""
+        try:
+            log_size = os.path.getsize(self.log_file)
+            snapshot_size = os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+        except OSError:
+            return
+        if log_size > max(2 * snapshot_size, LOG_COMPACT_MIN_BYTES):
+            self.save_notes(self._notes)
+    
+    @contextmanager
+    def batch(self):
+        """Group several mutations into a single snapshot write"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self.save_notes(self._notes)
+    
+    @_synchronized
     def create_note(self, title: str, content: str) -> Optional[str]:
         """Create a new note and return its ID"""
         try:
             notes = self.load_notes()
             note_id = str(uuid.uuid4())
-            current_time = datetime.now().isoformat()
+            current_time = datetime.now().isoformat(timespec='seconds')
             
             new_note = {
                 'id': note_id,
@@ -48,85 +231,90 @@ class NoteManager:
                 'updated_at': current_time
             }
             
-            notes.append(new_note)
+            # A new note normally sorts first; only notes created in the same
+            # second (or after a clock change) need stepping over
+            index = 0
+            new_key = _sort_key(new_note)
+            while index < len(notes) and _sort_key(notes[index]) > new_key:
+                index += 1
+            notes.insert(index, new_note)
+            self._by_id[note_id] = _annotate(new_note)
             
-            if self.save_notes(notes):
+            if self._append_log({'op': 'upsert', 'note': _strip_transient(new_note)}):
                 return note_id
             return None
         except Exception as e:
             print(f"Error creating note: {e}")
             return None
     
+    @_synchronized
     def get_note(self, note_id: str) -> Optional[Dict]:
         """Get a specific note by ID"""
         try:
-            notes = self.load_notes()
-            for note in notes:
-                if note['id'] == note_id:
-                    return note
-            return None
+            self.load_notes()
+            return self._by_id.get(note_id)
         except Exception as e:
             print(f"Error getting note: {e}")
             return None
     
+    @_synchronized
     def get_all_notes(self) -> List[Dict]:
-        """Get all notes sorted by creation date (newest first)"""
+        """Get all notes sorted by creation date (newest first); the returned list is shared, don't modify it"""
         try:
-            notes = self.load_notes()
-            # Sort by creation date, newest first
-            return sorted(notes, key=lambda x: x['created_at'], reverse=True)
+            return self.load_notes()
         except Exception as e:
             print(f"Error getting all notes: {e}")
             return []
     
+    @_synchronized
     def update_note(self, note_id: str, title: str, content: str) -> bool:
         """Update an existing note"""
         try:
-            notes = self.load_notes()
+            self.load_notes()
+            note = self._by_id.get(note_id)
+            if note is None:
+                return False  # Note not found
             
-            for i, note in enumerate(notes):
-                if note['id'] == note_id:
-                    notes[i]['title'] = title
-                    notes[i]['content'] = content
-                    notes[i]['updated_at'] = datetime.now().isoformat()
-                    return self.save_notes(notes)
-            
-            return False  # Note not found
+            # The indexed dict is the same object held in the notes list
+            note['title'] = title
+            note['content'] = content
+            note['updated_at'] = datetime.now().isoformat(timespec='seconds')
+            _annotate(note)
+            return self._append_log({'op': 'upsert', 'note': _strip_transient(note)})
         except Exception as e:
             print(f"Error updating note: {e}")
             return False
     
+    @_synchronized
     def delete_note(self, note_id: str) -> bool:
         """Delete a note by ID"""
         try:
             notes = self.load_notes()
-            original_length = len(notes)
-            notes = [note for note in notes if note['id'] != note_id]
+            note = self._by_id.pop(note_id, None)
+            if note is None:
+                return False  # Note not found
             
-            if len(notes) < original_length:
-                return self.save_notes(notes)
-            return False  # Note not found
+            notes.remove(note)
+            return self._append_log({'op': 'delete', 'id': note_id})
         except Exception as e:
             print(f"Error deleting note: {e}")
             return False
     
+    @_synchronized
     def search_notes(self, query: str) -> List[Dict]:
-        """Search notes by title or content"""
+        """Search notes by title or content (case-insensitive substring match)"""
         try:
             notes = self.get_all_notes()
-            query = query.lower()
-            
-            matching_notes = []
-            for note in notes:
-                if (query in note['title'].lower() or 
-                    query in note['content'].lower()):
-                    matching_notes.append(note)
-            
-            return matching_notes
+            query = query.casefold()
+            return [
+                note for note in notes
+                if query in note['_title_cf'] or query in note['_content_cf']
+            ]
         except Exception as e:
             print(f"Error searching notes: {e}")
             return []
     
+    @_synchronized
     def get_notes_count(self) -> int:
         """Get total number of notes"""
         try:
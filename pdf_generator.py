@@ -1,6 +1,9 @@
+import functools
 import io
 from datetime import datetime
-from typing import List, Dict
+from itertools import chain
+from operator import itemgetter
+from typing import BinaryIO, Iterator, List, Dict, Tuple
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -9,26 +12,154 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER
 from reportlab.pdfgen import canvas
 import re
 
+# Markdown patterns used by clean_content, compiled once at import
+# Headings and list markers are told apart by how the line starts, so they
+# are rewritten together in a single scan
+_LINE_RE = re.compile(r'^(?:(?P<heading>#{1,3}) (?P<heading_text>.*?)$|(?P<item>-|\d+\.) )', re.MULTILINE)
+_HEADING_SIZES = {1: '16', 2: '14', 3: '12'}
+_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC_RE = re.compile(r'\*(.*?)\*')
+_STRIKE_RE = re.compile(r'~~(.*?)~~')
+_CODE_RE = re.compile(r'`([^`]+)`')
+_QUOTE_RE = re.compile(r'^> (.*?)$', re.MULTILINE)
+_CODEBLOCK_RE = re.compile(r'```[\s\S]*?```')
+_CHECKLIST_RE = re.compile(r'^- \[([x ])\] (.*?)$', re.MULTILINE)
+_HR_RE = re.compile(r'^---+$', re.MULTILINE)
+_LINK_RE = re.compile(r'\[(.*?)\]\(.*?\)')
+
+# Rules drawn in the PDF: markdown horizontal rules, and the separators under
+# a single note's metadata and between the notes of a collection
+_HR_50 = '_' * 50
+_SEP_50 = '─' * 50
+_SEP_80 = '─' * 80
+
+def _replace_line_markup(match):
+    """Rewrite a heading line, or a '-'/numbered list marker, matched by _LINE_RE"""
+    if match.group('item'):
+        # Numbered lists become bullets too, for simplicity
+        return '• '
+    size = _HEADING_SIZES[len(match.group('heading'))]
+    return f'<b><font size="{size}">{match.group("heading_text")}</font></b>'
+
+def _replace_checklist(match):
+    """Rewrite a checked or unchecked checklist line"""
+    box = '✓' if match.group(1) == 'x' else '☐'
+    return f'{box} {match.group(2)}'
+
+def _format_table(table_text: str) -> str:
+    """Flatten markdown table rows into " • "-joined cells, one row per line"""
+    result = []
+    for line in table_text.split('\n'):
+        if '|' in line and not line.strip().startswith('|--'):
+            cells = [cell.strip() for cell in line.split('|') if cell.strip()]
+            if cells:
+                result.append(' • '.join(cells))
+    return '<br/>'.join(result)
+
+def _replace_tables(content: str) -> str:
+    """Rewrite tables (from the first '|' of a line with two, through following '|' lines; a final newline is consumed)"""
+    out = []
+    copied = 0
+    search = 0
+    end_of_content = len(content)
+    while True:
+        start = content.find('|', search)
+        if start == -1:
+            break
+        line_end = content.find('\n', start)
+        if line_end == -1:
+            line_end = end_of_content
+        if content.find('|', start + 1, line_end) == -1:
+            # A lone pipe isn't a table row
+            search = line_end + 1
+            continue
+        
+        end = line_end
+        while end < end_of_content and (end + 1 == end_of_content or content[end + 1] == '|'):
+            end = content.find('\n', end + 1)
+            if end == -1:
+                end = end_of_content
+        
+        out.append(content[copied:start])
+        out.append(_format_table(content[start:end]))
+        copied = search = end
+    
+    if not out:
+        return content
+    out.append(content[copied:])
+    return ''.join(out)
+
+# Timestamps never change once written, so each is parsed once and the
+# strings built from them are memoized
+@functools.lru_cache(maxsize=4096)
+def _parse_timestamp(iso: str) -> datetime:
+    return datetime.fromisoformat(iso)
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_toc_date(created_at: str) -> str:
+    return _parse_timestamp(created_at).strftime("%m/%d/%Y")
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_meta(created_at: str, updated_at: str) -> str:
+    """The "Created: ... | Last Updated: ..." line shown under a note's title"""
+    created_date = _parse_timestamp(created_at).strftime("%B %d, %Y at %I:%M %p")
+    if created_at == updated_at:
+        # Never edited; the update time isn't shown, so don't format it
+        return f"Created: {created_date}"
+    updated_date = _parse_timestamp(updated_at).strftime("%B %d, %Y at %I:%M %p")
+    return f"Created: {created_date} | Last Updated: {updated_date}"
+
+# Blank lines in a note become a double line break, which ends a paragraph
+_PARA_BREAK = '<br/><br/>'
+
+def _iter_paragraphs(html: str) -> Iterator[str]:
+    """Yield the stripped, non-blank paragraphs of converted markup"""
+    start = 0
+    while start <= len(html):
+        end = html.find(_PARA_BREAK, start)
+        if end == -1:
+            end = len(html)
+        paragraph = html[start:end].strip()
+        if paragraph:
+            yield paragraph
+        start = end + len(_PARA_BREAK)
+
+# The fields of a note that go into the collection PDF
+_NOTE_COLUMNS = ('title', 'created_at', 'updated_at', 'content')
+
+def _columnarize(notes: List[Dict]) -> Dict[str, Tuple]:
+    """Transpose notes into one tuple per exported field, so each dict is read once"""
+    rows = map(itemgetter(*_NOTE_COLUMNS), notes)
+    columns = tuple(zip(*rows)) or ((),) * len(_NOTE_COLUMNS)
+    return dict(zip(_NOTE_COLUMNS, columns))
+
 class PDFGenerator:
+    # Stylesheet shared by every instance, built on first use
+    _STYLES = None
+    
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
+        self.styles = self.setup_custom_styles()
     
-    def setup_custom_styles(self):
-        """Setup custom styles for PDF generation"""
+    @classmethod
+    def setup_custom_styles(cls):
+        """Setup custom styles for PDF generation (once per class) and return the stylesheet"""
+        if cls._STYLES is not None:
+            return cls._STYLES
+        styles = getSampleStyleSheet()
+        
         # Custom title style
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomTitle',
-            parent=self.styles['Title'],
+            parent=styles['Title'],
             fontSize=18,
             spaceAfter=12,
             textColor='#2C3E50'
         ))
         
         # Custom heading style
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomHeading',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=14,
             spaceAfter=8,
             spaceBefore=8,
@@ -36,9 +167,9 @@ class PDFGenerator:
         ))
         
         # Custom body style with better spacing
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomBody',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=11,
             spaceAfter=6,
             spaceBefore=2,
@@ -46,46 +177,70 @@ class PDFGenerator:
             rightIndent=0
         ))
         
+        # Note paragraphs: the gap that used to come from a Spacer after
+        # each one is part of the style, halving the flowables to lay out.
+        # The old Spacer(1, 6) also kept the next paragraph's spaceBefore
+        # from being absorbed, so the gap was 6 + 6 + 2 = 14pt
+        styles.add(ParagraphStyle(
+            name='NoteBody',
+            parent=styles['CustomBody'],
+            spaceAfter=14
+        ))
+        
         # Style for metadata
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='MetaData',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=9,
             textColor='#7F8C8D',
             spaceAfter=12
         ))
         
         # Style for note separator
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='Separator',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=8,
             textColor='#BDC3C7',
             alignment=TA_CENTER,
             spaceAfter=12,
             spaceBefore=12
         ))
+        
+        cls._STYLES = styles
+        return styles
     
-    def clean_content(self, content: str) -> str:
-        """Clean and prepare content for PDF with enhanced markdown support"""
-        # Handle headings first
-        content = re.sub(r'^### (.*?)$', r'<b><font size="12">\1</font></b>', content, flags=re.MULTILINE)  # H3
-        content = re.sub(r'^## (.*?)$', r'<b><font size="14">\1</font></b>', content, flags=re.MULTILINE)   # H2
-        content = re.sub(r'^# (.*?)$', r'<b><font size="16">\1</font></b>', content, flags=re.MULTILINE)    # H1
+    def clean_content(self, content: str) -> Tuple[str, ...]:
+        """Clean and prepare content for PDF with enhanced markdown support, as stripped non-empty paragraphs"""
+        return self._clean_content_cached(content)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _clean_content_cached(content: str) -> Tuple[str, ...]:
+        """Conversion behind clean_content, memoized so unchanged notes aren't re-converted on every export"""
+        # Each pass below needs some literal marker to match, so it is skipped
+        # when the marker is absent; plain prose goes straight to the line
+        # breaks. The checks look at the content as converted so far, which
+        # keeps them exact: no pass runs where it could have matched.
+        
+        # Handle headings and list markers first ("• " bullets are already in
+        # their final form). Inline formatting never touches a line's leading
+        # "- "/"1. ", so converting list markers before it gives the same result.
+        if '#' in content or '-' in content or '.' in content:
+            content = _LINE_RE.sub(_replace_line_markup, content)
         
         # Handle text formatting
-        content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', content)    # Bold
-        content = re.sub(r'\*(.*?)\*', r'<i>\1</i>', content)        # Italic
-        content = re.sub(r'~~(.*?)~~', r'<strike>\1</strike>', content)  # Strikethrough
-        content = re.sub(r'`([^`]+)`', r'<font face="Courier">\1</font>', content)  # Inline code
-        
-        # Handle lists
-        content = re.sub(r'^\• ', r'• ', content, flags=re.MULTILINE)        # Bullet points (•)
-        content = re.sub(r'^- ', r'• ', content, flags=re.MULTILINE)         # Bullet points (-)
-        content = re.sub(r'^\d+\. ', r'• ', content, flags=re.MULTILINE)     # Convert numbered lists to bullets for simplicity
+        if '*' in content:
+            content = _BOLD_RE.sub(r'<b>\1</b>', content)    # Bold
+            content = _ITALIC_RE.sub(r'<i>\1</i>', content)  # Italic
+        if '~~' in content:
+            content = _STRIKE_RE.sub(r'<strike>\1</strike>', content)  # Strikethrough
+        if '`' in content:
+            content = _CODE_RE.sub(r'<font face="Courier">\1</font>', content)  # Inline code
         
         # Handle quotes
-        content = re.sub(r'^> (.*?)$', r'<i>"  \1  "</i>', content, flags=re.MULTILINE)
+        if '> ' in content:
+            content = _QUOTE_RE.sub(r'<i>"  \1  "</i>', content)
         
         # Handle code blocks (better approach with content preservation)
         def replace_code_block(match):
@@ -94,37 +249,31 @@ class PDFGenerator:
             if len(code_content) > 100:
                 code_content = code_content[:100] + "..."
             return f'<font face="Courier" size="9">{code_content}</font>'
-        content = re.sub(r'```[\s\S]*?```', replace_code_block, content)
+        if '```' in content:
+            content = _CODEBLOCK_RE.sub(replace_code_block, content)
         
         # Handle tables (convert to simple format)
-        def replace_table(match):
-            table_text = match.group(0)
-            lines = table_text.split('\n')
-            result = []
-            for line in lines:
-                if '|' in line and not line.strip().startswith('|--'):
-                    cells = [cell.strip() for cell in line.split('|') if cell.strip()]
-                    if cells:
-                        result.append(' • '.join(cells))
-            return '<br/>'.join(result)
-        
-        content = re.sub(r'\|.*?\|[\s\S]*?(?=\n\n|\n[^|]|\Z)', replace_table, content, flags=re.MULTILINE)
+        content = _replace_tables(content)
         
         # Handle checklists
-        content = re.sub(r'^- \[x\] (.*?)$', r'✓ \1', content, flags=re.MULTILINE)  # Checked
-        content = re.sub(r'^- \[ \] (.*?)$', r'☐ \1', content, flags=re.MULTILINE)  # Unchecked
+        if '- [' in content:
+            content = _CHECKLIST_RE.sub(_replace_checklist, content)
         
         # Handle horizontal rules
-        content = re.sub(r'^---+$', r'_' * 50, content, flags=re.MULTILINE)
+        if '---' in content:
+            content = _HR_RE.sub(_HR_50, content)
         
         # Handle links (extract just the text for PDF)
-        content = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', content)
+        if '](' in content:
+            content = _LINK_RE.sub(r'\1', content)
         
-        # Handle line breaks
-        content = content.replace('\n\n', '<br/><br/>')
+        # Handle line breaks, then split into paragraphs; the paragraphs are
+        # cached with the conversion, so exports don't split them again
+        content = content.replace('\n\n', _PARA_BREAK)
         content = content.replace('\n', '<br/>')
         
-        return content
+        # A tuple, since the memoized result is shared between callers
+        return tuple(_iter_paragraphs(content))
     
     def generate_single_note_pdf(self, note: Dict) -> bytes:
         """Generate PDF for a single note"""
@@ -146,32 +295,17 @@ class PDFGenerator:
         story.append(Spacer(1, 12))
         
         # Add metadata
-        created_date = datetime.fromisoformat(note['created_at']).strftime("%B %d, %Y at %I:%M %p")
-        updated_date = datetime.fromisoformat(note['updated_at']).strftime("%B %d, %Y at %I:%M %p")
-        
-        meta_text = f"Created: {created_date}"
-        if note['created_at'] != note['updated_at']:
-            meta_text += f" | Last Updated: {updated_date}"
-        
-        metadata = Paragraph(meta_text, self.styles['MetaData'])
+        metadata = Paragraph(_fmt_meta(note['created_at'], note['updated_at']), self.styles['MetaData'])
         story.append(metadata)
         story.append(Spacer(1, 12))
         
         # Add horizontal line
-        separator = Paragraph("─" * 50, self.styles['Separator'])
+        separator = Paragraph(_SEP_50, self.styles['Separator'])
         story.append(separator)
         
-        # Add content
-        clean_content = self.clean_content(note['content'])
-        
-        # Split content into paragraphs
-        paragraphs = clean_content.split('<br/><br/>')
-        
-        for paragraph_text in paragraphs:
-            if paragraph_text.strip():
-                paragraph = Paragraph(paragraph_text.strip(), self.styles['CustomBody'])
-                story.append(paragraph)
-                story.append(Spacer(1, 6))
+        # Add content, paragraph by paragraph
+        story.extend(Paragraph(paragraph_text, self.styles['NoteBody'])
+                     for paragraph_text in self.clean_content(note['content']))
         
         # Build PDF
         try:
@@ -186,8 +320,17 @@ class PDFGenerator:
     def generate_all_notes_pdf(self, notes: List[Dict]) -> bytes:
         """Generate PDF for all notes"""
         buffer = io.BytesIO()
+        if self.generate_all_notes_pdf_to(notes, buffer):
+            buffer.seek(0)
+            return buffer.getvalue()
+        # Return a simple error PDF
+        return self.generate_error_pdf("Error generating notes collection PDF")
+    
+    def generate_all_notes_pdf_to(self, notes: List[Dict], sink: BinaryIO) -> bool:
+        """Write the PDF for all notes straight to a binary file-like sink, without
+        an in-memory copy; returns False (leaving partial output) if the build fails"""
         doc = SimpleDocTemplate(
-            buffer,
+            sink,
             pagesize=A4,
             topMargin=1*inch,
             bottomMargin=1*inch,
@@ -195,6 +338,10 @@ class PDFGenerator:
             rightMargin=1*inch
         )
         
+        columns = _columnarize(notes)
+        titles = columns['title']
+        created = columns['created_at']
+        
         story = []
         
         # Add cover page
@@ -220,62 +367,49 @@ class PDFGenerator:
         story.append(toc_title)
         story.append(Spacer(1, 12))
         
-        for i, note in enumerate(notes, 1):
-            created_date = datetime.fromisoformat(note['created_at']).strftime("%m/%d/%Y")
-            toc_entry = f"{i}. {note['title']} ({created_date})"
+        for i, (title, created_at) in enumerate(zip(titles, created), 1):
+            toc_entry = f"{i}. {title} ({_fmt_toc_date(created_at)})"
             toc_para = Paragraph(toc_entry, self.styles['CustomBody'])
             story.append(toc_para)
         
         story.append(PageBreak())
         
         # Add each note
-        for i, note in enumerate(notes, 1):
-            # Note number and title
-            note_title = f"{i}. {note['title']}"
-            title_para = Paragraph(note_title, self.styles['CustomTitle'])
-            story.append(title_para)
-            story.append(Spacer(1, 12))
-            
-            # Add metadata
-            created_date = datetime.fromisoformat(note['created_at']).strftime("%B %d, %Y at %I:%M %p")
-            updated_date = datetime.fromisoformat(note['updated_at']).strftime("%B %d, %Y at %I:%M %p")
-            
-            meta_text = f"Created: {created_date}"
-            if note['created_at'] != note['updated_at']:
-                meta_text += f" | Last Updated: {updated_date}"
-            
-            metadata = Paragraph(meta_text, self.styles['MetaData'])
-            story.append(metadata)
-            story.append(Spacer(1, 8))
-            
-            # Add content
-            clean_content = self.clean_content(note['content'])
-            
-            # Split content into paragraphs
-            paragraphs = clean_content.split('<br/><br/>')
-            
-            for paragraph_text in paragraphs:
-                if paragraph_text.strip():
-                    paragraph = Paragraph(paragraph_text.strip(), self.styles['CustomBody'])
-                    story.append(paragraph)
-                    story.append(Spacer(1, 6))
-            
-            # Add separator between notes (except for the last one)
-            if i < len(notes):
-                story.append(Spacer(1, 24))
-                separator = Paragraph("─" * 80, self.styles['Separator'])
-                story.append(separator)
-                story.append(Spacer(1, 24))
+        story.extend(chain.from_iterable(
+            self._iter_note_flowables(i, title, created_at, updated_at,
+                                      self.clean_content(content), i == len(notes))
+            for i, (title, created_at, updated_at, content) in enumerate(
+                zip(titles, created, columns['updated_at'], columns['content']), 1)
+        ))
         
         # Build PDF
         try:
             doc.build(story)
-            buffer.seek(0)
-            return buffer.getvalue()
+            return True
         except Exception as e:
             print(f"Error generating all notes PDF: {e}")
-            # Return a simple error PDF
-            return self.generate_error_pdf("Error generating notes collection PDF")
+            return False
+    
+    def _iter_note_flowables(self, i: int, title: str, created_at: str, updated_at: str,
+                             paragraphs: Tuple[str, ...], is_last: bool) -> Iterator:
+        """Yield the flowables for one note of the collection PDF, in order"""
+        # Note number and title
+        yield Paragraph(f"{i}. {title}", self.styles['CustomTitle'])
+        yield Spacer(1, 12)
+        
+        # Add metadata
+        yield Paragraph(_fmt_meta(created_at, updated_at), self.styles['MetaData'])
+        yield Spacer(1, 8)
+        
+        # Add content, paragraph by paragraph
+        for paragraph_text in paragraphs:
+            yield Paragraph(paragraph_text, self.styles['NoteBody'])
+        
+        # Add separator between notes (except after the last one)
+        if not is_last:
+            yield Spacer(1, 24)
+            yield Paragraph(_SEP_80, self.styles['Separator'])
+            yield Spacer(1, 24)
     
     def generate_error_pdf(self, error_message: str) -> bytes:
         """Generate a simple error PDF"""